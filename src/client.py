@@ -4,18 +4,49 @@
 """Sample MCP client for testing the Sequential Thinking MCP server."""
 
 import asyncio
-
-from dedalus_mcp import MCPClient
+from typing import Any
 
 
 SERVER_URL = "http://localhost:3014/mcp"
 
+# A thinking chain; the server numbers thoughts in arrival order, so these are
+# sent one after another rather than concurrently.
+THOUGHTS = [
+    {
+        "thought": "Let me analyze the problem: What is 15% of 80?",
+        "next_thought_needed": True,
+        "thought_number": 1,
+        "total_thoughts": 3,
+    },
+    {
+        "thought": "To find 15% of 80, I multiply 80 by 0.15: 80 × 0.15 = 12",
+        "next_thought_needed": True,
+        "thought_number": 2,
+        "total_thoughts": 3,
+    },
+    {
+        "thought": "The answer is 12. I can verify: 12/80 = 0.15 = 15%. Correct!",
+        "next_thought_needed": False,
+        "thought_number": 3,
+        "total_thoughts": 3,
+    },
+]
+
+
+async def run_chain(client: Any) -> list[Any]:
+    """Send THOUGHTS in order and collect the results."""
+    return [await client.call_tool("sequentialthinking", args) for args in THOUGHTS]
+
 
 async def main() -> None:
+    from dedalus_mcp import MCPClient  # Deferred: pulls in pydantic, httpx, anyio
+
     client = await MCPClient.connect(SERVER_URL)
 
+    # Listing tools does not depend on the chain, so both run concurrently
+    result, thoughts = await asyncio.gather(client.list_tools(), run_chain(client))
+
     # List tools
-    result = await client.list_tools()
     print(f"\nAvailable tools ({len(result.tools)}):\n")
     for t in result.tools:
         print(f"  {t.name}")
@@ -25,45 +56,9 @@ async def main() -> None:
 
     # Test sequentialthinking - simulate a thinking chain
     print("--- sequentialthinking ---")
-    
-    # Thought 1
-    thought1 = await client.call_tool(
-        "sequentialthinking",
-        {
-            "thought": "Let me analyze the problem: What is 15% of 80?",
-            "next_thought_needed": True,
-            "thought_number": 1,
-            "total_thoughts": 3,
-        },
-    )
-    print(thought1)
-    print()
-
-    # Thought 2
-    thought2 = await client.call_tool(
-        "sequentialthinking",
-        {
-            "thought": "To find 15% of 80, I multiply 80 by 0.15: 80 × 0.15 = 12",
-            "next_thought_needed": True,
-            "thought_number": 2,
-            "total_thoughts": 3,
-        },
-    )
-    print(thought2)
-    print()
-
-    # Thought 3 (final)
-    thought3 = await client.call_tool(
-        "sequentialthinking",
-        {
-            "thought": "The answer is 12. I can verify: 12/80 = 0.15 = 15%. Correct!",
-            "next_thought_needed": False,
-            "thought_number": 3,
-            "total_thoughts": 3,
-        },
-    )
-    print(thought3)
-    print()
+    for thought in thoughts:
+        print(thought)
+        print()
 
     # Get history
     print("--- get_thinking_history ---")
@@ -10,8 +10,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from server import main
-
 
 if __name__ == "__main__":
+    from server import main
+
     asyncio.run(main())
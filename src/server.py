@@ -15,7 +15,14 @@ server = MCPServer(
     streamable_http_stateless=True,
 )
 
+# Keep client connections open between tool calls so repeat callers skip the
+# TCP (and TLS) handshake, and allow a deeper accept queue for bursts.
+HTTP_OPTIONS = {
+    "timeout_keep_alive": 30,
+    "backlog": 2048,
+}
+
 
 async def main() -> None:
     server.collect(*thinking_tools)
-    await server.serve(port=8080)
+    await server.serve(port=8080, uvicorn_options=HTTP_OPTIONS)
@@ -7,17 +7,108 @@ A tool for dynamic and reflective problem-solving through thoughts.
 No API key required.
 """
 
-from typing import Any
+import asyncio
+import io
+import os
+import sys
+from typing import Any, Final
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from dedalus_mcp import tool
 
+from thinking_state import ThoughtRecord, append_op, clear_op, history_op, restore_op, snapshot_op, submit
 
-# --- Thought History (module-level state) ------------------------------------
 
-_thought_history: list[dict[str, Any]] = []
-_branches: dict[str, list[dict[str, Any]]] = {}
+# --- Server-side Logging -----------------------------------------------------
+
+# Formatted thoughts are queued rather than printed so tool calls never block
+# on stdout. The first _log() on an event loop starts a writer task there,
+# which coalesces whatever arrives within a short window and writes it with a
+# single syscall. When the queue is full, lines are dropped and counted
+# instead of applying backpressure to the tool handler.
+
+_LOG_QUEUE_MAX = 4096
+_LOG_BATCH_MAX = 64
+_LOG_BATCH_WINDOW = 0.005
+
+_log_queue: asyncio.Queue[bytes] | None = None
+_log_writer: asyncio.Task[None] | None = None
+_log_dropped = 0
+_log_reported = 0
+
+
+def _log(line: bytes) -> None:
+    """Queue an encoded line for the background log writer."""
+    global _log_dropped
+    try:
+        _ensure_log_writer(asyncio.get_running_loop()).put_nowait(line + b"\n")
+    except asyncio.QueueFull:
+        _log_dropped += 1
+
+
+def _ensure_log_writer(loop: asyncio.AbstractEventLoop) -> asyncio.Queue[bytes]:
+    """Return the running writer's queue, starting a new writer if needed."""
+    global _log_queue, _log_writer
+    if _log_writer is None or _log_writer.done() or _log_writer.get_loop() is not loop:
+        # Lines a previous writer never got to move to the new queue.
+        queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=_LOG_QUEUE_MAX)
+        while _log_queue is not None and not _log_queue.empty():
+            queue.put_nowait(_log_queue.get_nowait())
+        _log_queue = queue
+        _log_writer = loop.create_task(_drain_log(queue))
+    return _log_queue
+
+
+def _write_lines(fd: int, lines: list[bytes]) -> None:
+    """Write all of ``lines`` to ``fd``, preferring one vectored write."""
+    if hasattr(os, "writev"):
+        written = os.writev(fd, lines)
+        if written == sum(map(len, lines)):
+            return
+        data = b"".join(lines)[written:]
+    else:
+        data = b"".join(lines)
+    while data:
+        data = data[os.write(fd, data) :]
+
+
+def _write_batch(lines: list[bytes]) -> None:
+    """Write ``lines`` to stdout, falling back to text writes if it has no fd."""
+    stream = sys.stdout
+    stream.flush()  # Keep ordering with anything written via print()
+    try:
+        fd = stream.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        stream.write(b"".join(lines).decode())
+        stream.flush()
+        return
+    _write_lines(fd, lines)
+
+
+async def _drain_log(queue: asyncio.Queue[bytes]) -> None:
+    """Write lines from ``queue`` to stdout in batches until cancelled.
+
+    A failed write drops its batch and counts it like a full queue would;
+    the writer keeps running and reports the drops once writes succeed.
+    """
+    global _log_dropped, _log_reported
+    while True:
+        batch = [await queue.get()]
+        if queue.qsize() < _LOG_BATCH_MAX - 1:
+            await asyncio.sleep(_LOG_BATCH_WINDOW)
+        while len(batch) < _LOG_BATCH_MAX and not queue.empty():
+            batch.append(queue.get_nowait())
+        lines = len(batch)
+        unreported = _log_dropped - _log_reported
+        if unreported:
+            batch.append(f"[log] {unreported} line(s) dropped\n".encode())
+        try:
+            _write_batch(batch)
+        except (OSError, ValueError):
+            _log_dropped += lines
+            continue
+        _log_reported += unreported
 
 
 # --- Response Models ---------------------------------------------------------
@@ -26,76 +117,85 @@ _branches: dict[str, list[dict[str, Any]]] = {}
 class ThinkingResult(BaseModel):
     """Sequential thinking result."""
 
+    model_config = ConfigDict(frozen=True)
+
     success: bool
     data: Any = None
     error: str | None = None
 
 
+# Responses that carry no per-call data are built once and shared.
+_ERR_EMPTY_THOUGHT: Final = ThinkingResult(success=False, error="Invalid thought: must be a non-empty string")
+_ERR_BAD_NUMBER: Final = ThinkingResult(
+    success=False, error="Invalid thought_number or total_thoughts: must be integers >= 1"
+)
+_ERR_BAD_FLAG: Final = ThinkingResult(
+    success=False, error="Invalid next_thought_needed, is_revision or needs_more_thoughts: must be booleans"
+)
+_ERR_BAD_REFERENCE: Final = ThinkingResult(
+    success=False,
+    error="Invalid revises_thought, branch_from_thought or branch_id: must be an integer, a string or null",
+)
+_ERR_BAD_SNAPSHOT: Final = ThinkingResult(
+    success=False, error="Invalid snapshot_id: unknown or no longer restorable"
+)
+_CLEARED_RESULT: Final = ThinkingResult(success=True, data={"message": "Thought history cleared."})
+
+
 # --- Helper ------------------------------------------------------------------
 
 
-def _format_thought(thought_data: dict[str, Any]) -> str:
-    """Format a thought for display."""
-    thought_num = thought_data["thought_number"]
-    total = thought_data["total_thoughts"]
-    thought = thought_data["thought"]
-    is_revision = thought_data.get("is_revision", False)
-    revises = thought_data.get("revises_thought")
-    branch_from = thought_data.get("branch_from_thought")
-    branch_id = thought_data.get("branch_id")
-
-    if is_revision:
-        prefix = "🔄 Revision"
-        context = f" (revising thought {revises})"
-    elif branch_from:
-        prefix = "🌿 Branch"
-        context = f" (from thought {branch_from}, ID: {branch_id})"
-    else:
-        prefix = "💭 Thought"
-        context = ""
+def _ok(data: Any) -> ThinkingResult:
+    """Build a success result without re-validating fields we construct ourselves."""
+    return ThinkingResult.model_construct(success=True, data=data)
 
-    return f"{prefix} {thought_num}/{total}{context}: {thought}"
 
+def _is_int(value: Any) -> bool:
+    """Return True for ints, excluding bools."""
+    return isinstance(value, int) and not isinstance(value, bool)
 
-# --- Sequential Thinking Tool ------------------------------------------------
 
+# --- Sequential Thinking Tool ------------------------------------------------
 
-@tool(
-    description="""A detailed tool for dynamic and reflective problem-solving through thoughts.
-This tool helps analyze problems through a flexible thinking process that can adapt and evolve.
-Each thought can build on, question, or revise previous insights as understanding deepens.
-
-When to use this tool:
-- Breaking down complex problems into steps
-- Planning and design with room for revision
-- Analysis that might need course correction
-- Problems where the full scope might not be clear initially
-- Problems that require a multi-step solution
-- Tasks that need to maintain context over multiple steps
-- Situations where irrelevant information needs to be filtered out
-
-Key features:
-- You can adjust total_thoughts up or down as you progress
-- You can question or revise previous thoughts
-- You can add more thoughts even after reaching what seemed like the end
-- You can express uncertainty and explore alternative approaches
-- Not every thought needs to build linearly - you can branch or backtrack
-- Generates a solution hypothesis
-- Verifies the hypothesis based on the Chain of Thought steps
-- Repeats the process until satisfied
-- Provides a correct answer
-
-Parameters explained:
-- thought: Your current thinking step
-- next_thought_needed: True if you need more thinking
-- thought_number: Current number in sequence
-- total_thoughts: Current estimate of thoughts needed (can be adjusted)
-- is_revision: Boolean indicating if this thought revises previous thinking
-- revises_thought: If is_revision is true, which thought number is being reconsidered
-- branch_from_thought: If branching, which thought number is the branching point
-- branch_id: Identifier for the current branch (if any)
-- needs_more_thoughts: If reaching end but realizing more thoughts needed"""
+_SEQUENTIAL_THINKING_DESC: Final[str] = (
+    "A detailed tool for dynamic and reflective problem-solving through thoughts.\n"
+    "This tool helps analyze problems through a flexible thinking process that can adapt and evolve.\n"
+    "Each thought can build on, question, or revise previous insights as understanding deepens.\n"
+    "\n"
+    "When to use this tool:\n"
+    "- Breaking down complex problems into steps\n"
+    "- Planning and design with room for revision\n"
+    "- Analysis that might need course correction\n"
+    "- Problems where the full scope might not be clear initially\n"
+    "- Problems that require a multi-step solution\n"
+    "- Tasks that need to maintain context over multiple steps\n"
+    "- Situations where irrelevant information needs to be filtered out\n"
+    "\n"
+    "Key features:\n"
+    "- You can adjust total_thoughts up or down as you progress\n"
+    "- You can question or revise previous thoughts\n"
+    "- You can add more thoughts even after reaching what seemed like the end\n"
+    "- You can express uncertainty and explore alternative approaches\n"
+    "- Not every thought needs to build linearly - you can branch or backtrack\n"
+    "- Generates a solution hypothesis\n"
+    "- Verifies the hypothesis based on the Chain of Thought steps\n"
+    "- Repeats the process until satisfied\n"
+    "- Provides a correct answer\n"
+    "\n"
+    "Parameters explained:\n"
+    "- thought: Your current thinking step\n"
+    "- next_thought_needed: True if you need more thinking\n"
+    "- thought_number: Current number in sequence\n"
+    "- total_thoughts: Current estimate of thoughts needed (can be adjusted)\n"
+    "- is_revision: Boolean indicating if this thought revises previous thinking\n"
+    "- revises_thought: If is_revision is true, which thought number is being reconsidered\n"
+    "- branch_from_thought: If branching, which thought number is the branching point\n"
+    "- branch_id: Identifier for the current branch (if any)\n"
+    "- needs_more_thoughts: If reaching end but realizing more thoughts needed"
 )
+
+
+@tool(description=_SEQUENTIAL_THINKING_DESC)
 async def sequentialthinking(
     thought: str,
     next_thought_needed: bool,
@@ -123,60 +223,57 @@ async def sequentialthinking(
     Returns:
         ThinkingResult with thought processing status.
     """
-    global _thought_history, _branches
+    # Validate inputs (arguments arrive unvalidated from the framework)
+    if not isinstance(thought, str) or not thought:
+        return _ERR_EMPTY_THOUGHT
+    if not (_is_int(thought_number) and _is_int(total_thoughts)) or thought_number < 1 or total_thoughts < 1:
+        return _ERR_BAD_NUMBER
+    if not (
+        isinstance(next_thought_needed, bool)
+        and isinstance(is_revision, bool)
+        and isinstance(needs_more_thoughts, bool)
+    ):
+        return _ERR_BAD_FLAG
+    if not (
+        (revises_thought is None or _is_int(revises_thought))
+        and (branch_from_thought is None or _is_int(branch_from_thought))
+        and (branch_id is None or isinstance(branch_id, str))
+    ):
+        return _ERR_BAD_REFERENCE
+
+    # Adjust total if needed
+    if thought_number > total_thoughts:
+        total_thoughts = thought_number
+
+    # Create thought record
+    record = ThoughtRecord(
+        thought=thought,
+        thought_number=thought_number,
+        total_thoughts=total_thoughts,
+        next_thought_needed=next_thought_needed,
+        is_revision=is_revision,
+        revises_thought=revises_thought,
+        branch_from_thought=branch_from_thought,
+        branch_id=branch_id,
+        needs_more_thoughts=needs_more_thoughts,
+    )
 
-    try:
-        # Validate inputs
-        if not thought or not isinstance(thought, str):
-            return ThinkingResult(success=False, error="Invalid thought: must be a non-empty string")
-        if thought_number < 1:
-            return ThinkingResult(success=False, error="Invalid thought_number: must be >= 1")
-        if total_thoughts < 1:
-            return ThinkingResult(success=False, error="Invalid total_thoughts: must be >= 1")
-
-        # Adjust total if needed
-        if thought_number > total_thoughts:
-            total_thoughts = thought_number
-
-        # Create thought data
-        thought_data = {
-            "thought": thought,
+    # Store in history
+    history_length, branches = await submit(append_op, record)
+
+    # Format and log thought
+    _log(record.formatted)
+
+    return _ok(
+        {
             "thought_number": thought_number,
             "total_thoughts": total_thoughts,
             "next_thought_needed": next_thought_needed,
-            "is_revision": is_revision,
-            "revises_thought": revises_thought,
-            "branch_from_thought": branch_from_thought,
-            "branch_id": branch_id,
-            "needs_more_thoughts": needs_more_thoughts,
-        }
-
-        # Store in history
-        _thought_history.append(thought_data)
-
-        # Handle branching
-        if branch_from_thought and branch_id:
-            if branch_id not in _branches:
-                _branches[branch_id] = []
-            _branches[branch_id].append(thought_data)
-
-        # Format and log thought
-        formatted = _format_thought(thought_data)
-        print(formatted)  # Server-side logging
-
-        return ThinkingResult(
-            success=True,
-            data={
-                "thought_number": thought_number,
-                "total_thoughts": total_thoughts,
-                "next_thought_needed": next_thought_needed,
-                "branches": list(_branches.keys()),
-                "thought_history_length": len(_thought_history),
-                "formatted_thought": formatted,
-            },
-        )
-    except Exception as e:
-        return ThinkingResult(success=False, error=str(e))
+            "branches": branches,
+            "thought_history_length": history_length,
+            "formatted_thought": record.formatted_text,
+        },
+    )
 
 
 @tool(
@@ -188,12 +285,13 @@ async def get_thinking_history() -> ThinkingResult:
     Returns:
         ThinkingResult with thought history and branches.
     """
-    return ThinkingResult(
-        success=True,
-        data={
-            "thought_count": len(_thought_history),
-            "branches": list(_branches.keys()),
-            "history": _thought_history[-10:],  # Last 10 thoughts
+    thought_count, revision_count, branches, recent = await submit(history_op)
+    return _ok(
+        {
+            "thought_count": thought_count,
+            "revision_count": revision_count,
+            "branches": branches,
+            "history": [record.to_dict() for record in recent],
         },
     )
 
@@ -207,13 +305,48 @@ async def clear_thinking_history() -> ThinkingResult:
     Returns:
         ThinkingResult confirming the history was cleared.
     """
-    global _thought_history, _branches
-    _thought_history = []
-    _branches = {}
-    
-    return ThinkingResult(
-        success=True,
-        data={"message": "Thought history cleared."},
+    await submit(clear_op)
+    return _CLEARED_RESULT
+
+
+@tool(
+    description="Take a snapshot of the thought history that restore_thinking can roll back to."
+)
+async def snapshot_thinking() -> ThinkingResult:
+    """Snapshot the thought history.
+
+    Returns:
+        ThinkingResult with the snapshot ID.
+    """
+    snapshot_id = await submit(snapshot_op)
+    return _ok({"snapshot_id": snapshot_id})
+
+
+@tool(
+    description="Roll the thought history back to a snapshot, discarding thoughts recorded after it."
+)
+async def restore_thinking(snapshot_id: int) -> ThinkingResult:
+    """Restore the thought history to a snapshot.
+
+    Args:
+        snapshot_id: ID returned by snapshot_thinking.
+
+    Returns:
+        ThinkingResult with the restored history length and branches.
+    """
+    if not _is_int(snapshot_id):
+        return _ERR_BAD_SNAPSHOT
+    restored = await submit(restore_op, snapshot_id)
+    if restored is None:
+        return _ERR_BAD_SNAPSHOT
+
+    history_length, branches = restored
+    return _ok(
+        {
+            "snapshot_id": snapshot_id,
+            "branches": branches,
+            "thought_history_length": history_length,
+        },
     )
 
 
@@ -223,4 +356,6 @@ thinking_tools = [
     sequentialthinking,
     get_thinking_history,
     clear_thinking_history,
+    snapshot_thinking,
+    restore_thinking,
 ]
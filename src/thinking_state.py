@@ -0,0 +1,330 @@
+# Copyright (c) 2025 Dedalus Labs, Inc. and its contributors
+# SPDX-License-Identifier: MIT
+
+"""Thought history state for the Sequential Thinking tools.
+
+Kept apart from the tool definitions so that the state and its actor can be
+loaded, replaced or skipped independently of the MCP tool layer.
+"""
+
+import asyncio
+import os
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field, fields
+from itertools import islice
+from typing import Any
+
+
+# --- Thought Records ---------------------------------------------------------
+
+_PREFIX_REVISION = "🔄 Revision ".encode()
+_PREFIX_BRANCH = "🌿 Branch ".encode()
+_PREFIX_THOUGHT = "💭 Thought ".encode()
+
+
+@dataclass(slots=True, frozen=True)
+class ThoughtRecord:
+    """A single recorded thought."""
+
+    thought: str
+    thought_number: int
+    total_thoughts: int
+    next_thought_needed: bool
+    is_revision: bool = False
+    revises_thought: int | None = None
+    branch_from_thought: int | None = None
+    branch_id: str | None = None
+    needs_more_thoughts: bool = False
+    _formatted: bytes | None = field(default=None, init=False, repr=False, compare=False)
+    _formatted_text: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def formatted(self) -> bytes:
+        """The display line for this thought as UTF-8, rendered on first use."""
+        if self._formatted is None:
+            # Records are immutable, so the rendered line never goes stale.
+            object.__setattr__(self, "_formatted", self._render())
+        return self._formatted
+
+    @property
+    def formatted_text(self) -> str:
+        """The display line for this thought as text, decoded on first use."""
+        if self._formatted_text is None:
+            object.__setattr__(self, "_formatted_text", self.formatted.decode())
+        return self._formatted_text
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the recorded fields and display line as plain values."""
+        data = {name: getattr(self, name) for name in _RECORD_FIELDS}
+        data["formatted_thought"] = self.formatted_text
+        return data
+
+    def _render(self) -> bytes:
+        """Format the thought for display as UTF-8."""
+        if self.is_revision:
+            prefix = _PREFIX_REVISION
+            context = f" (revising thought {self.revises_thought})".encode()
+        elif self.branch_from_thought:
+            prefix = _PREFIX_BRANCH
+            context = f" (from thought {self.branch_from_thought}, ID: {self.branch_id})".encode()
+        else:
+            prefix = _PREFIX_THOUGHT
+            context = b""
+
+        return b"".join(
+            (
+                prefix,
+                str(self.thought_number).encode(),
+                b"/",
+                str(self.total_thoughts).encode(),
+                context,
+                b": ",
+                self.thought.encode(),
+            )
+        )
+
+
+_RECORD_FIELDS = tuple(f.name for f in fields(ThoughtRecord) if f.init)
+
+
+# --- Thought History (module-level state) ------------------------------------
+
+
+def _env_size(name: str, default: int) -> int:
+    """Read a size limit from the environment, rejecting values below 1."""
+    value = int(os.getenv(name, str(default)))
+    if value < 1:
+        raise ValueError(f"{name} must be >= 1, got {value}")
+    return value
+
+
+THINKING_HISTORY_MAX = _env_size("THINKING_HISTORY_MAX", 10000)
+MAX_BRANCHES = _env_size("THINKING_MAX_BRANCHES", 256)
+HISTORY_VIEW_SIZE = 10
+MAX_SNAPSHOTS = 256
+
+
+class _BranchMap(dict):
+    """Branch ID to thoughts, in creation order, creating missing branches on access.
+
+    Eviction follows recency, which is tracked separately so the reported
+    branch order only changes when a branch is created or evicted.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._recency: OrderedDict[str, None] = OrderedDict()
+
+    def __missing__(self, branch_id: str) -> deque[ThoughtRecord]:
+        global _branches_dirty
+        _branches_dirty = True
+        if len(self) >= MAX_BRANCHES:
+            del self[next(iter(self._recency))]
+        branch = self[branch_id] = deque(maxlen=THINKING_HISTORY_MAX)
+        self._recency[branch_id] = None
+        return branch
+
+    def __delitem__(self, branch_id: str) -> None:
+        super().__delitem__(branch_id)
+        del self._recency[branch_id]
+
+    def clear(self) -> None:
+        super().clear()
+        self._recency.clear()
+
+    def touch(self, branch_id: str) -> None:
+        """Mark a branch as the most recently used."""
+        self._recency.move_to_end(branch_id)
+
+
+# Both stores are bounded so long-running sessions keep a flat memory profile:
+# the oldest thoughts fall off the history, and the least recently used branch
+# is evicted once MAX_BRANCHES distinct branch IDs are live.
+_thought_history: deque[ThoughtRecord] = deque(maxlen=THINKING_HISTORY_MAX)
+_branches: _BranchMap = _BranchMap()
+
+# Branch IDs are reported on every call but change rarely, so the tuple is
+# rebuilt only after a branch is added, evicted or cleared.
+_branch_keys_cache: tuple[str, ...] = ()
+_branches_dirty = False
+
+# Revision flags are mirrored into a packed ring buffer, indexed in step with
+# _thought_history, so counting revisions runs in C instead of walking records.
+_revision_flags = array("B", bytes(THINKING_HISTORY_MAX))
+
+# Position of the next thought in the append sequence. It only goes backwards
+# on restore, and indexes the revision flag ring.
+_cursor = 0
+
+# Snapshot ID -> _cursor at the time it was taken. Records are immutable, so
+# returning to a snapshot only means dropping whatever was appended after it.
+# IDs are never reused, so an ID invalidated by a restore or clear stays
+# invalid; only the MAX_SNAPSHOTS most recent are kept.
+_snapshots: OrderedDict[int, int] = OrderedDict()
+_next_snapshot_id = 1
+
+
+# --- Helper ------------------------------------------------------------------
+
+
+def _recent_thoughts() -> list[ThoughtRecord]:
+    """Return the last HISTORY_VIEW_SIZE thoughts, oldest first."""
+    # Walk from the right end so the cost is independent of history length.
+    recent = list(islice(reversed(_thought_history), HISTORY_VIEW_SIZE))
+    recent.reverse()
+    return recent
+
+
+def _revision_count() -> int:
+    """Return how many retained thoughts are revisions."""
+    return _revision_flags.count(1)
+
+
+def _branch_of(record: ThoughtRecord) -> deque[ThoughtRecord] | None:
+    """Return the branch a record belongs to, creating it if needed."""
+    if record.branch_from_thought and record.branch_id:
+        return _branches[record.branch_id]
+    return None
+
+
+def _branch_keys() -> tuple[str, ...]:
+    """Return the current branch IDs, rebuilding the cached tuple if stale."""
+    global _branch_keys_cache, _branches_dirty
+    if _branches_dirty:
+        _branch_keys_cache = tuple(_branches)
+        _branches_dirty = False
+    return _branch_keys_cache
+
+
+# --- State Actor -------------------------------------------------------------
+
+# All reads and writes of the thought history go through a single task that
+# owns the state. Tool handlers submit an operation and await its result, so
+# each operation sees and leaves a consistent view regardless of how many
+# tool calls are in flight. The task is started by the first submit() on a
+# loop, and started again if it has stopped, so the tools work under any
+# server that collects them.
+
+_StateOp = Callable[[Any], Any]
+_StateQueue = asyncio.Queue[tuple[_StateOp, Any, asyncio.Future[Any]]]
+
+_state_ops: _StateQueue | None = None
+_actor: asyncio.Task[None] | None = None
+
+
+def append_op(record: ThoughtRecord) -> tuple[int, tuple[str, ...]]:
+    """Record a thought; return the new history length and branch IDs."""
+    global _cursor
+    # Resolve the branch first: an unhashable ID raises here, before anything
+    # has been written, so a rejected record never leaves partial state.
+    branch = _branch_of(record)
+
+    _revision_flags[_cursor % THINKING_HISTORY_MAX] = 1 if record.is_revision else 0
+    _thought_history.append(record)
+    _cursor += 1
+
+    # Handle branching
+    if branch is not None:
+        branch.append(record)
+        _branches.touch(record.branch_id)
+
+    return len(_thought_history), _branch_keys()
+
+
+def history_op(_: None) -> tuple[int, int, tuple[str, ...], list[ThoughtRecord]]:
+    """Return the history length, revision count, branch IDs and most recent thoughts."""
+    return len(_thought_history), _revision_count(), _branch_keys(), _recent_thoughts()
+
+
+def clear_op(_: None) -> None:
+    """Drop all thoughts and branches."""
+    global _branch_keys_cache, _branches_dirty
+    _thought_history.clear()
+    _branches.clear()
+    _branch_keys_cache = ()
+    _branches_dirty = False
+    _revision_flags[:] = array("B", bytes(THINKING_HISTORY_MAX))
+    _snapshots.clear()
+
+
+def snapshot_op(_: None) -> int:
+    """Return an ID that restore_op can later roll the history back to."""
+    global _next_snapshot_id
+    snapshot_id = _next_snapshot_id
+    _next_snapshot_id += 1
+    _snapshots[snapshot_id] = _cursor
+    if len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    return snapshot_id
+
+
+def restore_op(snapshot_id: int) -> tuple[int, tuple[str, ...]] | None:
+    """Drop thoughts recorded after ``snapshot_id``.
+
+    Returns the new history length and branch IDs, or None if the snapshot
+    is unknown, was invalidated by a restore to an earlier point or a clear,
+    or its thoughts have already been evicted.
+    """
+    global _branches_dirty, _cursor
+    position = _snapshots.get(snapshot_id)
+    if position is None or position < _cursor - len(_thought_history):
+        return None
+
+    while _cursor > position:
+        _thought_history.pop()
+        _cursor -= 1
+        _revision_flags[_cursor % THINKING_HISTORY_MAX] = 0
+
+    # Replaying the retained thoughts drops branches that only held later
+    # thoughts and brings back any evicted after the snapshot was taken.
+    _branches.clear()
+    for record in _thought_history:
+        branch = _branch_of(record)
+        if branch is not None:
+            branch.append(record)
+            _branches.touch(record.branch_id)
+    _branches_dirty = True
+
+    # Snapshots past this point describe thoughts that no longer exist.
+    for later_id in [sid for sid, pos in _snapshots.items() if pos > position]:
+        del _snapshots[later_id]
+
+    return len(_thought_history), _branch_keys()
+
+
+async def _run_state_actor(ops: _StateQueue) -> None:
+    """Apply operations from ``ops`` one at a time until cancelled."""
+    try:
+        while True:
+            op, payload, future = await ops.get()
+            if future.cancelled():
+                continue
+            try:
+                future.set_result(op(payload))
+            except Exception as e:
+                future.set_exception(e)
+    finally:
+        # Nothing will serve operations still queued; fail them, don't strand them.
+        while not ops.empty():
+            _, _, future = ops.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Thought state actor stopped"))
+
+
+def _ensure_actor(loop: asyncio.AbstractEventLoop) -> _StateQueue:
+    """Return the running actor's queue, starting a new actor if needed."""
+    global _actor, _state_ops
+    if _actor is None or _actor.done() or _actor.get_loop() is not loop:
+        _state_ops = asyncio.Queue()
+        _actor = loop.create_task(_run_state_actor(_state_ops))
+    return _state_ops
+
+
+async def submit(op: _StateOp, payload: Any = None) -> Any:
+    """Hand an operation to the state actor and wait for its result."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _ensure_actor(loop).put_nowait((op, payload, future))
+    return await future
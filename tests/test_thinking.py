@@ -0,0 +1,124 @@
+# Copyright (c) 2025 Dedalus Labs, Inc. and its contributors
+# SPDX-License-Identifier: MIT
+
+"""Tests for the Sequential Thinking tools."""
+
+import asyncio
+import importlib
+
+import pytest
+
+pytest.importorskip("dedalus_mcp")
+
+import thinking
+import thinking_state
+
+
+@pytest.fixture
+def tools():
+    """The thinking module on top of a freshly loaded, empty state."""
+    importlib.reload(thinking_state)
+    return importlib.reload(thinking)
+
+
+def think(tools, number, **kwargs):
+    args = {
+        "thought": f"thought {number}",
+        "next_thought_needed": True,
+        "thought_number": number,
+        "total_thoughts": 3,
+    }
+    args.update(kwargs)
+    return tools.sequentialthinking(**args)
+
+
+def test_tools_work_without_a_server(tools):
+    async def scenario():
+        await think(tools, 1)
+        return await tools.get_thinking_history()
+
+    result = asyncio.run(scenario())
+
+    assert result.success
+    assert result.data["thought_count"] == 1
+
+
+@pytest.mark.parametrize(
+    ("overrides", "error"),
+    [
+        ({"thought": ""}, "_ERR_EMPTY_THOUGHT"),
+        ({"thought_number": "1"}, "_ERR_BAD_NUMBER"),
+        ({"total_thoughts": True}, "_ERR_BAD_NUMBER"),
+        ({"thought_number": 0}, "_ERR_BAD_NUMBER"),
+        ({"is_revision": "yes"}, "_ERR_BAD_FLAG"),
+        ({"next_thought_needed": 1}, "_ERR_BAD_FLAG"),
+        ({"revises_thought": "1"}, "_ERR_BAD_REFERENCE"),
+        ({"branch_from_thought": 1, "branch_id": ["a"]}, "_ERR_BAD_REFERENCE"),
+    ],
+)
+def test_invalid_arguments_are_rejected_without_recording(tools, overrides, error):
+    async def scenario():
+        await think(tools, 1)
+        rejected = await think(tools, 2, **overrides)
+        history = await tools.get_thinking_history()
+        snapshot = await tools.snapshot_thinking()
+        await think(tools, 2)
+        restored = await tools.restore_thinking(snapshot_id=snapshot.data["snapshot_id"])
+        return rejected, history, restored
+
+    rejected, history, restored = asyncio.run(scenario())
+
+    assert rejected is getattr(tools, error)
+    assert history.data["thought_count"] == 1
+    assert restored.data["thought_history_length"] == 1
+
+
+def test_log_writer_survives_write_errors(tools, monkeypatch):
+    written = []
+
+    def flaky_write(lines):
+        if not written:
+            written.append(None)
+            raise BrokenPipeError
+        written.extend(lines)
+
+    monkeypatch.setattr(tools, "_write_batch", flaky_write)
+
+    async def scenario():
+        tools._log(b"first")
+        await asyncio.sleep(0.02)
+        tools._log(b"second")
+        await asyncio.sleep(0.02)
+
+    asyncio.run(scenario())
+
+    assert written[1:] == [b"second\n", b"[log] 1 line(s) dropped\n"]
+
+
+def test_log_writer_starts_on_each_loop(tools, monkeypatch):
+    written = []
+    monkeypatch.setattr(tools, "_write_batch", written.extend)
+
+    async def log_and_wait(line):
+        tools._log(line)
+        await asyncio.sleep(0.02)
+
+    asyncio.run(log_and_wait(b"first"))
+    asyncio.run(log_and_wait(b"second"))
+
+    assert written == [b"first\n", b"second\n"]
+
+
+@pytest.mark.parametrize("snapshot_id", [True, "1", 1.0])
+def test_restore_rejects_non_integer_snapshot_ids(tools, snapshot_id):
+    async def scenario():
+        await think(tools, 1)
+        await think(tools, 2)
+        rejected = await tools.restore_thinking(snapshot_id=snapshot_id)
+        history = await tools.get_thinking_history()
+        return rejected, history
+
+    rejected, history = asyncio.run(scenario())
+
+    assert rejected is tools._ERR_BAD_SNAPSHOT
+    assert history.data["thought_count"] == 2
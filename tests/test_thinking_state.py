@@ -0,0 +1,244 @@
+# Copyright (c) 2025 Dedalus Labs, Inc. and its contributors
+# SPDX-License-Identifier: MIT
+
+"""Tests for the thought history state in thinking_state."""
+
+import asyncio
+import importlib
+
+import pytest
+
+import thinking_state
+
+
+@pytest.fixture
+def state(monkeypatch):
+    """A freshly loaded thinking_state with small, predictable limits."""
+    monkeypatch.setenv("THINKING_HISTORY_MAX", "4")
+    monkeypatch.setenv("THINKING_MAX_BRANCHES", "2")
+    yield importlib.reload(thinking_state)
+    monkeypatch.delenv("THINKING_HISTORY_MAX")
+    monkeypatch.delenv("THINKING_MAX_BRANCHES")
+    importlib.reload(thinking_state)
+
+
+def record(state, number, **kwargs):
+    return state.ThoughtRecord(
+        thought=f"thought {number}",
+        thought_number=number,
+        total_thoughts=number,
+        next_thought_needed=True,
+        **kwargs,
+    )
+
+
+def history_summary(state):
+    count, revisions, branches, recent = state.history_op(None)
+    return count, revisions, branches, [r.thought_number for r in recent]
+
+
+# --- append_op ---------------------------------------------------------------
+
+
+def test_append_counts_revisions_and_branches(state):
+    state.append_op(record(state, 1))
+    state.append_op(record(state, 2, is_revision=True, revises_thought=1))
+    state.append_op(record(state, 3, branch_from_thought=1, branch_id="a"))
+
+    assert history_summary(state) == (3, 1, ("a",), [1, 2, 3])
+
+
+def test_formatted_line_is_rendered_and_decoded_once(state):
+    thought = record(state, 1, branch_from_thought=1, branch_id="a")
+
+    assert thought.formatted_text == "🌿 Branch 1/1 (from thought 1, ID: a): thought 1"
+    assert thought.formatted is thought.formatted
+    assert thought.to_dict()["formatted_thought"] is thought.formatted_text
+
+
+def test_large_thought_number_is_stored(state):
+    state.append_op(record(state, 3_000_000_000))
+
+    assert history_summary(state) == (1, 0, (), [3_000_000_000])
+
+
+def test_rejected_record_leaves_state_unchanged(state):
+    state.append_op(record(state, 1))
+
+    with pytest.raises(TypeError):
+        state.append_op(record(state, 2, branch_from_thought=1, branch_id=["unhashable"]))
+
+    assert history_summary(state) == (1, 0, (), [1])
+    assert state._cursor == 1
+
+
+def test_oldest_branch_is_evicted(state):
+    for number, branch_id in enumerate("abc", start=1):
+        state.append_op(record(state, number, branch_from_thought=1, branch_id=branch_id))
+
+    assert history_summary(state)[2] == ("b", "c")
+
+
+def test_switching_branches_keeps_reported_order(state):
+    state.append_op(record(state, 1, branch_from_thought=1, branch_id="a"))
+    _, branches = state.append_op(record(state, 2, branch_from_thought=1, branch_id="b"))
+
+    for number, branch_id in enumerate("abab", start=3):
+        _, again = state.append_op(record(state, number, branch_from_thought=1, branch_id=branch_id))
+        assert again is branches
+
+    assert branches == ("a", "b")
+
+
+def test_least_recently_used_branch_is_evicted(state):
+    state.append_op(record(state, 1, branch_from_thought=1, branch_id="a"))
+    state.append_op(record(state, 2, branch_from_thought=1, branch_id="b"))
+    state.append_op(record(state, 3, branch_from_thought=1, branch_id="a"))
+    _, branches = state.append_op(record(state, 4, branch_from_thought=1, branch_id="c"))
+
+    assert branches == ("a", "c")
+
+
+@pytest.mark.parametrize("name", ["THINKING_HISTORY_MAX", "THINKING_MAX_BRANCHES"])
+def test_size_limits_must_be_positive(monkeypatch, name):
+    monkeypatch.setenv(name, "0")
+
+    with pytest.raises(ValueError, match=name):
+        importlib.reload(thinking_state)
+
+    monkeypatch.delenv(name)
+    importlib.reload(thinking_state)
+
+
+# --- State actor -------------------------------------------------------------
+
+
+def test_submit_starts_actor_on_each_loop(state):
+    async def append_and_count(number):
+        await state.submit(state.append_op, record(state, number))
+        return (await state.submit(state.history_op))[0]
+
+    assert asyncio.run(append_and_count(1)) == 1
+    assert asyncio.run(append_and_count(2)) == 2
+
+
+def test_submit_restarts_a_stopped_actor(state):
+    async def scenario():
+        await state.submit(state.snapshot_op)
+        state._actor.cancel()
+        await asyncio.sleep(0)
+        return await state.submit(state.snapshot_op)
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_queued_operations_fail_when_actor_stops(state):
+    async def scenario():
+        await state.submit(state.snapshot_op)
+        state._actor.cancel()
+        return await state.submit(state.snapshot_op)
+
+    with pytest.raises(RuntimeError, match="actor stopped"):
+        asyncio.run(scenario())
+
+
+# --- snapshot_op / restore_op ------------------------------------------------
+
+
+def test_restore_drops_later_thoughts_and_empty_branches(state):
+    state.append_op(record(state, 1, branch_from_thought=1, branch_id="a"))
+    snapshot_id = state.snapshot_op(None)
+    state.append_op(record(state, 2, is_revision=True, revises_thought=1))
+    state.append_op(record(state, 3, branch_from_thought=1, branch_id="b"))
+    state.append_op(record(state, 4, branch_from_thought=1, branch_id="a"))
+
+    assert state.restore_op(snapshot_id) == (1, ("a",))
+    assert history_summary(state) == (1, 0, ("a",), [1])
+    assert len(state._branches["a"]) == 1
+
+
+def test_restore_skips_branches_already_evicted(state):
+    snapshot_id = state.snapshot_op(None)
+    for number, branch_id in enumerate("abc", start=1):
+        state.append_op(record(state, number, branch_from_thought=1, branch_id=branch_id))
+
+    # "a" was evicted when "c" arrived; rolling back past it must not fail.
+    assert state.restore_op(snapshot_id) == (0, ())
+    assert history_summary(state) == (0, 0, (), [])
+
+
+def test_restore_brings_back_branches_evicted_after_snapshot(state):
+    state.append_op(record(state, 1, branch_from_thought=1, branch_id="a"))
+    state.append_op(record(state, 2, branch_from_thought=1, branch_id="b"))
+    snapshot_id = state.snapshot_op(None)
+    _, branches = state.append_op(record(state, 3, branch_from_thought=1, branch_id="c"))
+    assert branches == ("b", "c")
+
+    assert state.restore_op(snapshot_id) == (2, ("a", "b"))
+    assert [r.thought_number for r in state._branches["a"]] == [1]
+
+    # Recency is rebuilt too: "a" is now the least recently used again.
+    _, branches = state.append_op(record(state, 4, branch_from_thought=1, branch_id="d"))
+    assert branches == ("b", "d")
+
+
+def test_restore_to_oldest_retained_thought(state):
+    state.append_op(record(state, 1))
+    state.append_op(record(state, 2))
+    snapshot_id = state.snapshot_op(None)
+    for number in range(3, 7):
+        state.append_op(record(state, number, is_revision=number == 6))
+
+    # History holds thoughts 3-6, so the snapshot after 2 is still restorable.
+    assert state.restore_op(snapshot_id) == (0, ())
+    assert history_summary(state) == (0, 0, (), [])
+
+
+def test_restore_rejects_evicted_snapshot(state):
+    state.append_op(record(state, 1))
+    snapshot_id = state.snapshot_op(None)
+    for number in range(2, 7):
+        state.append_op(record(state, number))
+
+    assert state.restore_op(snapshot_id) is None
+    assert history_summary(state) == (4, 0, (), [3, 4, 5, 6])
+
+
+def test_restore_rejects_unknown_and_cleared_snapshots(state):
+    state.append_op(record(state, 1))
+    snapshot_id = state.snapshot_op(None)
+    state.append_op(record(state, 2))
+
+    assert state.restore_op(snapshot_id + 5) is None
+
+    state.clear_op(None)
+    assert state.restore_op(snapshot_id) is None
+    assert state.restore_op(state.snapshot_op(None)) == (0, ())
+
+
+def test_restore_invalidates_later_snapshots(state):
+    state.append_op(record(state, 1))
+    first = state.snapshot_op(None)
+    state.append_op(record(state, 2))
+    state.append_op(record(state, 3))
+    second = state.snapshot_op(None)
+
+    assert state.restore_op(first) == (1, ())
+    state.append_op(record(state, 10))
+    state.append_op(record(state, 11))
+    third = state.snapshot_op(None)
+
+    # second described [1, 2, 3]; its position is reachable again but not its thoughts.
+    assert state.restore_op(second) is None
+    assert history_summary(state) == (3, 0, (), [1, 10, 11])
+    assert state.restore_op(first) == (1, ())
+    assert state.restore_op(third) is None
+    assert state.restore_op(first) == (1, ())
+
+
+def test_snapshots_beyond_limit_are_forgotten(state, monkeypatch):
+    monkeypatch.setattr(state, "MAX_SNAPSHOTS", 2)
+    ids = [state.snapshot_op(None) for _ in range(3)]
+
+    assert state.restore_op(ids[0]) is None
+    assert state.restore_op(ids[2]) == (0, ())